@@ -6,63 +6,257 @@ Provides a web interface for the deep research tool.
 
 import os
 import time
+import atexit
+import functools
+import hashlib
+import io
+import re
 import uuid
-import json
+import queue
 import threading
 import requests
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+try:
+    import orjson
+except ImportError:  # no wheel for this platform; keep Flask's default provider
+    orjson = None
 from flask import Flask, render_template, request, jsonify, send_file, Response
+from flask.json.provider import DefaultJSONProvider
 from dotenv import load_dotenv
 from google import genai
 from docx import Document
 from docx.shared import Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 
+from cobs_research import (
+    add_formatted_content, cache_read, cache_write, dig, json_dumps, json_loads,
+    poll_interaction, safe_filename
+)
+
 # Load environment variables
 load_dotenv()
 
+
+class ORJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that serializes with orjson.
+
+    Output matches DefaultJSONProvider except that non-ASCII text is sent as
+    UTF-8 rather than \\u escapes; orjson has no ensure_ascii mode. Calls
+    that pass stdlib json keyword arguments fall back to the default provider.
+    """
+
+    ensure_ascii = False
+
+    def _options(self):
+        # Match the stdlib provider: stringify non-str keys, honor sort_keys,
+        # and leave dates to self.default so they are formatted as HTTP dates
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        options = self._options()
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options |= orjson.OPT_INDENT_2
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=options) + b"\n",
+            mimetype=self.mimetype
+        )
+
+
 app = Flask(__name__)
+if orjson is not None:
+    app.json = ORJSONProvider(app)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 
 # File-based task storage for persistence across restarts
 TASKS_FILE = Path('tasks.json')
+TASKS_WAL_FILE = Path('tasks.wal')
+TASKS_WRITE_DELAY = 0.5  # seconds to coalesce task writes before persisting
+TERMINAL_STATUSES = ('completed', 'failed')
+MAX_TASKS = int(os.environ.get('MAX_TASKS', '500'))
+TASK_TTL = 24 * 3600  # seconds a task stays available after creation
+
+# Seconds between keepalive comments on idle status streams
+SSE_KEEPALIVE_INTERVAL = 15
+
+# Bounded pool for background research; each task can poll for up to an hour
+RESEARCH_WORKERS = int(os.environ.get('RESEARCH_WORKERS', '8'))
+EXECUTOR = ThreadPoolExecutor(max_workers=RESEARCH_WORKERS, thread_name_prefix='research')
+# Research submitted to EXECUTOR and not yet finished. Single requests are
+# only admitted while a worker is free; batches may queue up to the limit
+RESEARCH_QUEUE_LIMIT = int(os.environ.get('RESEARCH_QUEUE_LIMIT', str(6 * RESEARCH_WORKERS)))
+_research_in_flight = 0
+_research_lock = threading.Lock()
 OUTPUTS_DIR = Path('outputs')
+OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
+
+# Finished research by normalized location, so repeat requests within the
+# TTL skip a Deep Research run entirely
+REPORT_CACHE_TTL = int(os.environ.get('REPORT_CACHE_TTL', str(24 * 3600)))
+_REPORT_CACHE = {}  # location -> (results, monotonic time stored)
+_REPORT_CACHE_LOCK = threading.Lock()
 
 # Google Deep Research agent ID
 AGENT_ID = "deep-research-pro-preview-12-2025"
+MAX_RESEARCH_TIME = 3600  # seconds to wait for the agent before giving up
+PROMPT_REVIEW_CHARS = 500  # per-review cap on text embedded in the prompt
 
 # Model for Google Search grounding (Gemini 2.x)
 GROUNDING_MODEL = "gemini-2.5-flash"
 
+# Alignment for the report title block
+_CENTER = WD_ALIGN_PARAGRAPH.CENTER
+
+# Report fields scraped by extract_sentiment_data
+_OVERALL_RE = re.compile(r'\*\*Overall Sentiment\*\*:\s*\[?(\w+)', re.IGNORECASE)
+_SCORE_RE = re.compile(r'\*\*Sentiment Score\*\*:\s*\[?(\d+\.?\d*)', re.IGNORECASE)
+_CONFIDENCE_RE = re.compile(r'\*\*Confidence Level\*\*:\s*\[?(\w+)', re.IGNORECASE)
+_TOTAL_REVIEWS_RE = re.compile(r'\*\*Total(?:\s+number\s+of)?\s+reviews?\s+analyzed\*\*:\s*\[?(\d+)', re.IGNORECASE)
+_VERY_POSITIVE_ROW_RE = re.compile(r'Very Positive.*?\|\s*(\d+)\s*\|\s*(\d+)%', re.IGNORECASE)
+_POSITIVE_ROW_RE = re.compile(r'\|\s*Positive\s*\(General.*?\|\s*(\d+)\s*\|\s*(\d+)%', re.IGNORECASE)
+_NEUTRAL_ROW_RE = re.compile(r'Neutral.*?\|\s*(\d+)\s*\|\s*(\d+)%', re.IGNORECASE)
+_NEGATIVE_ROW_RE = re.compile(r'\|\s*Negative\s*\(Disappointment.*?\|\s*(\d+)\s*\|\s*(\d+)%', re.IGNORECASE)
+_VERY_NEGATIVE_ROW_RE = re.compile(r'Very Negative.*?\|\s*(\d+)\s*\|\s*(\d+)%', re.IGNORECASE)
+_PRODUCT_RE = re.compile(r'\*\*Product Quality Sentiment\*\*:\s*\[?(\w+)', re.IGNORECASE)
+_SERVICE_RE = re.compile(r'\*\*Service Quality Sentiment\*\*:\s*\[?(\w+)', re.IGNORECASE)
+_VALUE_RE = re.compile(r'\*\*Value for Money Sentiment\*\*:\s*\[?(\w+)', re.IGNORECASE)
+_ATMOSPHERE_RE = re.compile(r'\*\*Atmosphere.*?Sentiment\*\*:\s*\[?(\w+)', re.IGNORECASE)
+_CONVENIENCE_RE = re.compile(r'\*\*Convenience.*?Sentiment\*\*:\s*\[?(\w+)', re.IGNORECASE)
+
+# On-disk cache for slow-changing Places data, shared across restarts
+CACHE_DIR = Path('.cache')
+PLACE_ID_CACHE_DIR = CACHE_DIR / 'place_ids'
+PLACE_ID_CACHE_TTL = 30 * 24 * 3600  # business -> place ID is effectively fixed
+PLACE_ID_MEMORY_TTL = 24 * 3600  # in-process copy, re-checked against disk daily
+REVIEWS_CACHE_DIR = CACHE_DIR / 'reviews'
+REVIEWS_CACHE_TTL = 3600  # new reviews trickle in over days
+INSIGHTS_CACHE_DIR = CACHE_DIR / 'insights'
+INSIGHTS_CACHE_TTL = 6 * 3600  # grounding is the slowest prefetch call
+INSIGHTS_PROGRESS_INTERVAL = 1.0  # seconds between streamed progress updates
+
 
 # =============================================================================
 # PREFETCH FUNCTIONS - Get verified data before Deep Research
 # =============================================================================
 
+# Shared HTTP session so Places and Gemini calls reuse pooled connections.
+# Rate limits and transient 5xx are retried with backoff (honoring
+# Retry-After); POST is included since every call here is a read.
+SESSION = requests.Session()
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=50,
+    pool_maxsize=50,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET', 'POST'}),
+        raise_on_status=False
+    )
+))
+
+# Google GenAI client shared by all research tasks
+_client = None
+_client_lock = threading.Lock()
+
+
+# Normalized query -> (place ID, monotonic expiry), in front of the disk cache
+_place_ids = {}
+_place_ids_lock = threading.Lock()
+
+
+def get_client() -> genai.Client:
+    """Return the process-wide Google GenAI client, creating it on first use."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = genai.Client()
+        return _client
+
+
+def _normalize_query(text: str) -> str:
+    """Fold case and whitespace so equivalent queries share cache entries."""
+    return ' '.join(text.lower().split())
+
+
+def _cache_path(cache_dir: Path, text: str) -> Path:
+    """Cache file for free text, normalized for case and whitespace."""
+    return cache_dir / f"{hashlib.sha1(_normalize_query(text).encode()).hexdigest()}.json"
+
+
+def _remember_place_id(key: str, place_id: str) -> str:
+    """Keep a place ID in the in-process cache."""
+    with _place_ids_lock:
+        _place_ids[key] = (place_id, time.monotonic() + PLACE_ID_MEMORY_TTL)
+    return place_id
+
+
+def clear_place_id_cache():
+    """Drop in-process place IDs; the on-disk cache is left alone."""
+    with _place_ids_lock:
+        _place_ids.clear()
+
+
 def find_place_id(query: str) -> str:
     """Find Google Place ID using Places API Text Search."""
     api_key = os.environ.get('GOOGLE_PLACES_API_KEY')
     if not api_key:
         return None
 
+    # In-process first, then disk, then the API
+    key = _normalize_query(query)
+    with _place_ids_lock:
+        place_id, expires_at = _place_ids.get(key, (None, 0))
+    if place_id and time.monotonic() < expires_at:
+        return place_id
+
+    cache_path = _cache_path(PLACE_ID_CACHE_DIR, query)
+    cached = cache_read(cache_path, PLACE_ID_CACHE_TTL)
+    if cached and cached.get('place_id'):
+        return _remember_place_id(key, cached['place_id'])
+
     url = "https://places.googleapis.com/v1/places:searchText"
     headers = {
         "Content-Type": "application/json",
         "X-Goog-Api-Key": api_key,
-        "X-Goog-FieldMask": "places.id,places.displayName,places.formattedAddress"
+        # Only the ID is used; details come from the legacy call, which can
+        # sort reviews by newest (the new API only returns "most relevant")
+        "X-Goog-FieldMask": "places.id"
     }
     payload = {"textQuery": query}
 
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=30)
+        response = SESSION.post(url, json=payload, headers=headers, timeout=30)
         if response.status_code == 200:
             data = response.json()
             places = data.get("places", [])
             if places:
-                return places[0].get('id')
+                place_id = places[0].get('id')
+                if place_id:
+                    cache_write(cache_path, {'query': query, 'place_id': place_id})
+                    _remember_place_id(key, place_id)
+                return place_id
     except Exception as e:
         print(f"Error finding place ID: {e}")
 
@@ -83,6 +277,11 @@ def fetch_google_reviews(location: str) -> dict:
     if not place_id:
         return {'success': False, 'error': 'Could not find place'}
 
+    cache_path = REVIEWS_CACHE_DIR / f"{place_id}.json"
+    cached = cache_read(cache_path, REVIEWS_CACHE_TTL)
+    if cached:
+        return cached
+
     # Step 2: Fetch reviews using Legacy API (supports newest sorting)
     url = "https://maps.googleapis.com/maps/api/place/details/json"
     params = {
@@ -93,7 +292,7 @@ def fetch_google_reviews(location: str) -> dict:
     }
 
     try:
-        response = requests.get(url, params=params, timeout=30)
+        response = SESSION.get(url, params=params, timeout=30)
         if response.status_code != 200:
             return {'success': False, 'error': f'API error: {response.status_code}'}
 
@@ -114,7 +313,7 @@ def fetch_google_reviews(location: str) -> dict:
                 'text': r.get('text', '')
             })
 
-        return {
+        reviews_data = {
             'success': True,
             'business_name': result.get('name', 'COBS Bread'),
             'address': result.get('formatted_address', ''),
@@ -124,20 +323,30 @@ def fetch_google_reviews(location: str) -> dict:
             'reviews': formatted_reviews,
             'place_id': place_id
         }
+        cache_write(cache_path, reviews_data)
+        return reviews_data
 
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
 
-def fetch_search_grounding_insights(location: str) -> dict:
+def fetch_search_grounding_insights(location: str, on_progress=None) -> dict:
     """
     Fetch review insights using Gemini Google Search grounding.
     Searches across Yelp, TripAdvisor, Reddit, UberEats, etc.
+
+    The response is streamed; on_progress, if given, is called with the
+    number of characters received so far after each chunk.
     """
     api_key = os.environ.get('GOOGLE_API_KEY')
     if not api_key:
         return {'success': False, 'error': 'No Gemini API key'}
 
+    cache_path = _cache_path(INSIGHTS_CACHE_DIR, location)
+    cached = cache_read(cache_path, INSIGHTS_CACHE_TTL)
+    if cached:
+        return cached
+
     prompt = f"""
 Search the web for reviews and feedback SPECIFICALLY about the COBS Bread bakery location in {location}.
 
@@ -163,137 +372,347 @@ If you cannot find location-specific reviews for a platform, state "No {location
 Focus on quality over quantity - only verified {location}-specific feedback.
 """
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{GROUNDING_MODEL}:generateContent?key={api_key}"
+    url = f"https://generativelanguage.googleapis.com/v1beta/models/{GROUNDING_MODEL}:streamGenerateContent?alt=sse&key={api_key}"
     payload = {
         "contents": [{"role": "user", "parts": [{"text": prompt}]}],
         "tools": [{"googleSearch": {}}]
     }
 
     try:
-        response = requests.post(url, json=payload, headers={"Content-Type": "application/json"}, timeout=90)
-        if response.status_code != 200:
-            return {'success': False, 'error': f'API error: {response.status_code}'}
-
-        data = response.json()
-        text = data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
-
-        # Extract sources
-        grounding = data.get("candidates", [{}])[0].get("groundingMetadata", {})
-        sources = []
-        for chunk in grounding.get("groundingChunks", []):
-            web_data = chunk.get("web", {})
-            if web_data:
-                sources.append(web_data.get('title', ''))
-
-        return {
+        text_parts = []
+        sources = {}  # titles in first-seen order, without repeats
+        received = 0
+
+        # Server-sent events, one partial GenerateContentResponse per data line
+        with SESSION.post(url, json=payload, headers={"Content-Type": "application/json"},
+                          timeout=90, stream=True) as response:
+            if response.status_code != 200:
+                return {'success': False, 'error': f'API error: {response.status_code}'}
+
+            for line in response.iter_lines():
+                if not line.startswith(b'data:'):
+                    continue
+                candidate = dig(json_loads(line[5:]), "candidates", 0, default={})
+
+                for part in dig(candidate, "content", "parts", default=()):
+                    text = part.get("text", "")
+                    text_parts.append(text)
+                    received += len(text)
+
+                # Extract sources; grounding metadata arrives with the last chunks
+                for chunk in dig(candidate, "groundingMetadata", "groundingChunks", default=()):
+                    title = dig(chunk, "web", "title")
+                    if title:
+                        sources[title] = None
+
+                if on_progress:
+                    on_progress(received)
+
+        insights = {
             'success': True,
-            'insights': text,
-            'sources': sources
+            'insights': "".join(text_parts),
+            'sources': list(sources)
         }
+        # A stream without candidate text (e.g. a blocked prompt) is not worth keeping
+        if insights['insights']:
+            cache_write(cache_path, insights)
+        return insights
 
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
 
+# Shared pool for prefetch calls; each running research task uses two
+PREFETCH_EXECUTOR = ThreadPoolExecutor(max_workers=2 * RESEARCH_WORKERS, thread_name_prefix='prefetch')
+
+# Word generation is CPU-bound, so only a couple of documents are built at once
+DOC_WORKERS = int(os.environ.get('DOC_WORKERS', '2'))
+
+
+def _threading_patched() -> bool:
+    """True under gevent's monkey-patching (gunicorn's gevent worker)."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+if _threading_patched():
+    # Patched pool threads are greenlets on the event loop, where a document
+    # build would stall every other request; gevent's executor uses real threads
+    from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+    DOC_EXECUTOR = NativeThreadPoolExecutor(max_workers=DOC_WORKERS)
+else:
+    DOC_EXECUTOR = ThreadPoolExecutor(max_workers=DOC_WORKERS, thread_name_prefix='docx')
+
+
+def prefetch_location_data(location: str, on_insights_progress=None, on_result=None) -> tuple:
+    """
+    Fetch Google reviews and search grounding insights concurrently.
+
+    on_result, if given, is called as ('google_reviews' | 'search_insights',
+    result) for each fetch as soon as it finishes.
+    """
+    futures = {
+        PREFETCH_EXECUTOR.submit(fetch_google_reviews, location): 'google_reviews',
+        PREFETCH_EXECUTOR.submit(
+            fetch_search_grounding_insights, location, on_insights_progress
+        ): 'search_insights'
+    }
+
+    results = {}
+    for future in as_completed(futures):
+        name = futures[future]
+        results[name] = future.result()
+        if on_result:
+            on_result(name, results[name])
+    return results['google_reviews'], results['search_insights']
+
+
 def load_tasks():
-    """Load tasks from file."""
-    if TASKS_FILE.exists():
-        try:
-            with open(TASKS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
+    """Load tasks from the last snapshot and replay the write-ahead log."""
+    try:
+        tasks = json_loads(TASKS_FILE.read_bytes())
+    except:
+        tasks = {}
+    _replay_wal(tasks)
+
+    # Research threads don't survive a restart; settle the tasks they left
+    # behind so eviction, which only drops finished tasks, can reclaim them
+    for task in tasks.values():
+        if task.get('status') not in TERMINAL_STATUSES:
+            task.update(status='failed', error='Research was interrupted by a server restart')
+    return tasks
 
 
-def save_tasks(tasks):
-    """Save tasks to file."""
+def _replay_wal(tasks):
+    """Apply task writes logged since the last snapshot."""
     try:
-        with open(TASKS_FILE, 'w') as f:
-            json.dump(tasks, f, indent=2)
+        wal = TASKS_WAL_FILE.read_bytes()
+    except FileNotFoundError:
+        return
+
+    for line in wal.splitlines():
+        try:
+            entry = json_loads(line)
+        except ValueError:
+            # Only the last line can be torn by a crash mid-append
+            continue
+        for task_id, updates in entry.items():
+            # Updates to a task evicted before the last snapshot have nothing
+            # to apply to; only a creation entry (which carries 'id') does
+            if task_id in tasks:
+                tasks[task_id].update(updates)
+            elif 'id' in updates:
+                tasks[task_id] = updates
+
+
+def save_tasks(tasks) -> bool:
+    """Atomically save tasks to file."""
+    tmp_path = TASKS_FILE.with_suffix('.json.tmp')
+    try:
+        # Buffered, so a short write is retried rather than truncating the snapshot
+        with open(tmp_path, 'wb') as f:
+            f.write(json_dumps(tasks, indent=True))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, TASKS_FILE)
+        return True
     except Exception as e:
         print(f"Error saving tasks: {e}")
+        return False
+
+
+# In-memory task store, least recently used first; every write is appended
+# to the WAL and folded into tasks.json by the writer thread.
+TASKS = OrderedDict(load_tasks())
+TASKS_LOCK = threading.RLock()
+_dirty = threading.Event()
+_WAL_FD = os.open(TASKS_WAL_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+# Status update queues for clients listening on /api/research/<task_id>/stream
+_SUBSCRIBERS = {}
+_SUBSCRIBERS_LOCK = threading.Lock()
+
+
+def _append_wal(task_id, updates):
+    """Append a single task write to the WAL."""
+    os.write(_WAL_FD, json_dumps({task_id: updates}) + b'\n')
+
+
+def snapshot_tasks():
+    """Write all tasks to tasks.json and truncate the WAL."""
+    with TASKS_LOCK:
+        if os.fstat(_WAL_FD).st_size == 0:
+            return
+        if save_tasks(TASKS):
+            os.ftruncate(_WAL_FD, 0)
+
+
+def flush_tasks():
+    """Persist tasks immediately instead of waiting for the writer thread."""
+    _dirty.clear()
+    snapshot_tasks()
+
+
+def _writer_loop():
+    """Persist tasks after they change, collapsing bursts into one write."""
+    while True:
+        _dirty.wait()
+        time.sleep(TASKS_WRITE_DELAY)
+        _dirty.clear()
+        snapshot_tasks()
+
+
+threading.Thread(target=_writer_loop, name='tasks-writer', daemon=True).start()
+atexit.register(snapshot_tasks)
+
+
+def _task_created_at(task) -> float:
+    """Task creation time as a timestamp; unreadable values count as expired."""
+    try:
+        return datetime.fromisoformat(task['created_at']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+
+def _task_expired(task, now=None) -> bool:
+    """True once a task is older than TASK_TTL, however recently it was read."""
+    return _task_created_at(task) < (now or time.time()) - TASK_TTL
+
+
+def evict_tasks():
+    """
+    Drop finished tasks older than TASK_TTL, then the least recently used
+    finished tasks beyond MAX_TASKS.
+
+    Pending and running tasks are never evicted, even if that leaves the
+    store over MAX_TASKS: a task in Deep Research can go an hour without a
+    write, and dropping it would silently lose its result.
+    """
+    now = time.time()
+    with TASKS_LOCK:
+        finished = [tid for tid, task in TASKS.items() if task.get('status') in TERMINAL_STATUSES]
+        # Recency doesn't matter for expiry, so scan everything, not just the LRU head
+        expired = {tid for tid in finished if _task_expired(TASKS[tid], now)}
+        for task_id in expired:
+            del TASKS[task_id]
+        excess = len(TASKS) - MAX_TASKS
+        if excess > 0:
+            for task_id in [tid for tid in finished if tid not in expired][:excess]:
+                del TASKS[task_id]
+
+
+evict_tasks()
 
 
 def get_task(task_id):
-    """Get a specific task."""
-    tasks = load_tasks()
-    return tasks.get(task_id)
+    """Get a snapshot of a specific task from memory."""
+    with TASKS_LOCK:
+        task = TASKS.get(task_id)
+        # Expired finished tasks stay hidden until the next eviction removes them
+        if task is None or (task.get('status') in TERMINAL_STATUSES and _task_expired(task)):
+            return None
+        TASKS.move_to_end(task_id)
+        # Copy under the lock so callers never see a half-applied update
+        return dict(task)
 
 
 def update_task(task_id, updates):
     """Update a specific task."""
-    tasks = load_tasks()
-    if task_id in tasks:
-        tasks[task_id].update(updates)
-        save_tasks(tasks)
-    return tasks.get(task_id)
+    with TASKS_LOCK:
+        task = TASKS.get(task_id)
+        if task is None:
+            return None
+        TASKS.move_to_end(task_id)
+        task.update(updates)
+        _append_wal(task_id, updates)
+        payload = status_payload(task_id, task)
+
+    _publish(task_id, payload)
+
+    # Terminal states are persisted right away; everything else is coalesced
+    if updates.get('status') in TERMINAL_STATUSES:
+        flush_tasks()
+    else:
+        _dirty.set()
+    return task
 
 
 def create_task(task_id, task_data):
     """Create a new task."""
-    tasks = load_tasks()
-    tasks[task_id] = task_data
-    save_tasks(tasks)
+    with TASKS_LOCK:
+        TASKS[task_id] = task_data
+        _append_wal(task_id, task_data)
+        evict_tasks()
+    _dirty.set()
     return task_data
 
 
-def build_research_prompt(bakery_location: str, google_reviews: dict = None, search_insights: dict = None) -> str:
-    """Build comprehensive research prompt for COBS Bread bakery analysis."""
-    today = datetime.now().strftime('%B %d, %Y')
+# Prefetch progress recorded by run_research and shown while a task runs
+_PROGRESS_FIELDS = (
+    'stage', 'insights_chars',
+    'google_reviews_count', 'google_rating', 'google_reviews_error',
+    'search_sources_count', 'search_error'
+)
 
-    # Build prefetched data section
-    prefetch_section = ""
 
-    # Add Google Reviews if available
-    if google_reviews and google_reviews.get('success'):
-        reviews_text = ""
-        for r in google_reviews.get('reviews', []):
-            reviews_text += f"\n- **{r['author']}** ({r['time']}) - {r['rating']}/5 stars:\n  \"{r['text']}\"\n"
+def status_payload(task_id, task):
+    """Build the client-facing status for a task."""
+    response = {
+        'task_id': task_id,
+        'status': task['status'],
+        'location': task['location']
+    }
 
-        prefetch_section += f"""
-## VERIFIED GOOGLE REVIEWS DATA (from Google Places API)
-**Business:** {google_reviews.get('business_name', 'COBS Bread')}
-**Address:** {google_reviews.get('address', 'N/A')}
-**Phone:** {google_reviews.get('phone', 'N/A')}
-**Google Rating:** {google_reviews.get('rating', 'N/A')}/5 ({google_reviews.get('total_reviews', 0)} total reviews)
+    if task['status'] == 'running':
+        for field in _PROGRESS_FIELDS:
+            if field in task:
+                response[field] = task[field]
 
-### 5 Most Recent Google Reviews (sorted by date):
-{reviews_text}
----
-"""
+    if task['status'] == 'completed':
+        response['report_length'] = task.get('report_length', 0)
+        response['document_path'] = task.get('document_path')
+        response['sentiment'] = task.get('sentiment', {})
 
-    # Add Search Grounding insights if available
-    if search_insights and search_insights.get('success'):
-        prefetch_section += f"""
-## MULTI-PLATFORM REVIEW INSIGHTS (from Google Search Grounding)
-The following insights were gathered from web search across multiple platforms:
+    if task['status'] == 'failed':
+        response['error'] = task.get('error', 'Unknown error')
 
-{search_insights.get('insights', '')}
+    return response
 
-**Sources searched:** {', '.join(search_insights.get('sources', [])[:10])}
----
-"""
 
-    # Add instruction if prefetch data exists
-    if prefetch_section:
-        prefetch_section = f"""
-# PRE-FETCHED VERIFIED DATA
-The following data has been verified and grounded from official APIs and web search.
-Use this as your foundation and expand upon it with additional deep research.
+def _subscribe(task_id):
+    """Register a queue that receives status updates for a task."""
+    updates = queue.Queue()
+    with _SUBSCRIBERS_LOCK:
+        _SUBSCRIBERS.setdefault(task_id, []).append(updates)
+    return updates
 
-{prefetch_section}
 
-# NOW CONDUCT ADDITIONAL DEEP RESEARCH
-Expand on the above verified data by searching for more reviews and insights.
----
+def _unsubscribe(task_id, updates):
+    """Remove a status update queue registered with _subscribe."""
+    with _SUBSCRIBERS_LOCK:
+        queues = _SUBSCRIBERS.get(task_id, [])
+        if updates in queues:
+            queues.remove(updates)
+        if not queues:
+            _SUBSCRIBERS.pop(task_id, None)
 
-"""
 
-    return f"""
-You are conducting an exhaustive deep research analysis of customer reviews for the COBS Bread bakery located at: {bakery_location}
-{prefetch_section}
-**TODAY'S DATE: {today}**
+def _publish(task_id, payload):
+    """Push a status update to every client streaming this task."""
+    with _SUBSCRIBERS_LOCK:
+        queues = list(_SUBSCRIBERS.get(task_id, ()))
+    for updates in queues:
+        updates.put(payload)
+
+
+# Static body of the Deep Research prompt; filled in by build_research_prompt.
+# Everything per-request sits in the TARGET block at the very end so the
+# instructions form an identical prefix the model provider can cache.
+_RESEARCH_PROMPT_TEMPLATE = """
+You are conducting an exhaustive deep research analysis of customer reviews for a single COBS Bread bakery location. The bakery location, today's date and any pre-fetched verified data are given in the TARGET section at the end of these instructions.
 
 ## CRITICAL REQUIREMENTS - READ CAREFULLY:
 
@@ -584,12 +1003,85 @@ Break down sentiment for each key area:
 **CITE EVERYTHING**: Every claim needs a direct quote with source attribution.
 
 Remember: This research will inform critical business decisions. Only verified, quotable data should be included.
+
+# TARGET
+**BAKERY LOCATION:** {location}
+**TODAY'S DATE: {today}**
+{prefetch}"""
+
+
+_PREFETCH_SECTION_TEMPLATE = """
+# PRE-FETCHED VERIFIED DATA
+The following data has been verified and grounded from official APIs and web search.
+Use this as your foundation and expand upon it with additional deep research.
+
+{data}
+
+# NOW CONDUCT ADDITIONAL DEEP RESEARCH
+Expand on the above verified data by searching for more reviews and insights.
+---
+
 """
 
 
+def build_research_prompt(bakery_location: str, google_reviews: dict = None, search_insights: dict = None) -> str:
+    """Build comprehensive research prompt for COBS Bread bakery analysis."""
+    today = datetime.now().strftime('%B %d, %Y')
+
+    # Build prefetched data section
+    parts = []
+
+    # Add Google Reviews if available
+    if google_reviews and google_reviews.get('success'):
+        reviews_text = "".join(
+            f"\n- **{r['author']}** ({r['time']}) - {r['rating']}/5 stars:\n  \"{r['text'][:PROMPT_REVIEW_CHARS]}\"\n"
+            for r in google_reviews.get('reviews', [])
+        )
+
+        parts.append(f"""
+## VERIFIED GOOGLE REVIEWS DATA (from Google Places API)
+**Business:** {google_reviews.get('business_name', 'COBS Bread')}
+**Address:** {google_reviews.get('address', 'N/A')}
+**Phone:** {google_reviews.get('phone', 'N/A')}
+**Google Rating:** {google_reviews.get('rating', 'N/A')}/5 ({google_reviews.get('total_reviews', 0)} total reviews)
+
+### 5 Most Recent Google Reviews (sorted by date):
+{reviews_text}
+---
+""")
+
+    # Add Search Grounding insights if available
+    if search_insights and search_insights.get('success'):
+        parts.append(f"""
+## MULTI-PLATFORM REVIEW INSIGHTS (from Google Search Grounding)
+The following insights were gathered from web search across multiple platforms:
+
+{search_insights.get('insights', '')}
+
+**Sources searched:** {', '.join(search_insights.get('sources', [])[:10])}
+---
+""")
+
+    # Add instruction if prefetch data exists
+    prefetch_section = ""
+    if parts:
+        prefetch_section = _PREFETCH_SECTION_TEMPLATE.format(data="".join(parts))
+
+    return _render_research_prompt(bakery_location, prefetch_section, today)
+
+
+@functools.lru_cache(maxsize=32)
+def _render_research_prompt(bakery_location: str, prefetch_section: str, today: str) -> str:
+    """Fill the prompt template; keyed on the date so entries expire daily."""
+    return _RESEARCH_PROMPT_TEMPLATE.format(
+        location=bakery_location,
+        prefetch=prefetch_section,
+        today=today
+    )
+
+
 def extract_sentiment_data(report_content: str) -> dict:
     """Extract sentiment analysis data from the report for UI display."""
-    import re
 
     sentiment_data = {
         'overall_sentiment': 'Positive',
@@ -616,55 +1108,55 @@ def extract_sentiment_data(report_content: str) -> dict:
 
     try:
         # Extract overall sentiment
-        overall_match = re.search(r'\*\*Overall Sentiment\*\*:\s*\[?(\w+)', report_content, re.IGNORECASE)
+        overall_match = _OVERALL_RE.search(report_content)
         if overall_match:
             sentiment_data['overall_sentiment'] = overall_match.group(1)
 
         # Extract sentiment score
-        score_match = re.search(r'\*\*Sentiment Score\*\*:\s*\[?(\d+\.?\d*)', report_content, re.IGNORECASE)
+        score_match = _SCORE_RE.search(report_content)
         if score_match:
             sentiment_data['sentiment_score'] = float(score_match.group(1))
 
         # Extract confidence level
-        confidence_match = re.search(r'\*\*Confidence Level\*\*:\s*\[?(\w+)', report_content, re.IGNORECASE)
+        confidence_match = _CONFIDENCE_RE.search(report_content)
         if confidence_match:
             sentiment_data['confidence'] = confidence_match.group(1)
 
         # Extract total reviews
-        total_match = re.search(r'\*\*Total(?:\s+number\s+of)?\s+reviews?\s+analyzed\*\*:\s*\[?(\d+)', report_content, re.IGNORECASE)
+        total_match = _TOTAL_REVIEWS_RE.search(report_content)
         if total_match:
             sentiment_data['total_reviews'] = int(total_match.group(1))
 
         # Extract sentiment breakdown percentages
-        very_pos_match = re.search(r'Very Positive.*?\|\s*(\d+)\s*\|\s*(\d+)%', report_content, re.IGNORECASE)
+        very_pos_match = _VERY_POSITIVE_ROW_RE.search(report_content)
         if very_pos_match:
             sentiment_data['breakdown']['very_positive'] = {
                 'count': int(very_pos_match.group(1)),
                 'percentage': int(very_pos_match.group(2))
             }
 
-        pos_match = re.search(r'\|\s*Positive\s*\(General.*?\|\s*(\d+)\s*\|\s*(\d+)%', report_content, re.IGNORECASE)
+        pos_match = _POSITIVE_ROW_RE.search(report_content)
         if pos_match:
             sentiment_data['breakdown']['positive'] = {
                 'count': int(pos_match.group(1)),
                 'percentage': int(pos_match.group(2))
             }
 
-        neutral_match = re.search(r'Neutral.*?\|\s*(\d+)\s*\|\s*(\d+)%', report_content, re.IGNORECASE)
+        neutral_match = _NEUTRAL_ROW_RE.search(report_content)
         if neutral_match:
             sentiment_data['breakdown']['neutral'] = {
                 'count': int(neutral_match.group(1)),
                 'percentage': int(neutral_match.group(2))
             }
 
-        neg_match = re.search(r'\|\s*Negative\s*\(Disappointment.*?\|\s*(\d+)\s*\|\s*(\d+)%', report_content, re.IGNORECASE)
+        neg_match = _NEGATIVE_ROW_RE.search(report_content)
         if neg_match:
             sentiment_data['breakdown']['negative'] = {
                 'count': int(neg_match.group(1)),
                 'percentage': int(neg_match.group(2))
             }
 
-        very_neg_match = re.search(r'Very Negative.*?\|\s*(\d+)\s*\|\s*(\d+)%', report_content, re.IGNORECASE)
+        very_neg_match = _VERY_NEGATIVE_ROW_RE.search(report_content)
         if very_neg_match:
             sentiment_data['breakdown']['very_negative'] = {
                 'count': int(very_neg_match.group(1)),
@@ -672,23 +1164,23 @@ def extract_sentiment_data(report_content: str) -> dict:
             }
 
         # Extract category sentiments
-        prod_match = re.search(r'\*\*Product Quality Sentiment\*\*:\s*\[?(\w+)', report_content, re.IGNORECASE)
+        prod_match = _PRODUCT_RE.search(report_content)
         if prod_match:
             sentiment_data['categories']['product_quality'] = prod_match.group(1)
 
-        service_match = re.search(r'\*\*Service Quality Sentiment\*\*:\s*\[?(\w+)', report_content, re.IGNORECASE)
+        service_match = _SERVICE_RE.search(report_content)
         if service_match:
             sentiment_data['categories']['service_quality'] = service_match.group(1)
 
-        value_match = re.search(r'\*\*Value for Money Sentiment\*\*:\s*\[?(\w+)', report_content, re.IGNORECASE)
+        value_match = _VALUE_RE.search(report_content)
         if value_match:
             sentiment_data['categories']['value_for_money'] = value_match.group(1)
 
-        atmosphere_match = re.search(r'\*\*Atmosphere.*?Sentiment\*\*:\s*\[?(\w+)', report_content, re.IGNORECASE)
+        atmosphere_match = _ATMOSPHERE_RE.search(report_content)
         if atmosphere_match:
             sentiment_data['categories']['atmosphere'] = atmosphere_match.group(1)
 
-        convenience_match = re.search(r'\*\*Convenience.*?Sentiment\*\*:\s*\[?(\w+)', report_content, re.IGNORECASE)
+        convenience_match = _CONVENIENCE_RE.search(report_content)
         if convenience_match:
             sentiment_data['categories']['convenience'] = convenience_match.group(1)
 
@@ -698,8 +1190,9 @@ def extract_sentiment_data(report_content: str) -> dict:
     return sentiment_data
 
 
-def generate_word_document(bakery_location: str, report_content: str, output_path: str) -> str:
-    """Generate a formatted Word document from the research report."""
+@functools.lru_cache(maxsize=1)
+def _report_template() -> bytes:
+    """Serialized starting document with styles and the title block applied."""
     doc = Document()
 
     # Set up styles
@@ -709,10 +1202,20 @@ def generate_word_document(bakery_location: str, report_content: str, output_pat
 
     # Title
     title = doc.add_heading('COBS Bread Bakery', level=0)
-    title.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    title.alignment = _CENTER
 
     subtitle = doc.add_heading('Comprehensive Review Analysis Report', level=1)
-    subtitle.alignment = WD_ALIGN_PARAGRAPH.CENTER
+    subtitle.alignment = _CENTER
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def generate_word_document(bakery_location: str, report_content: str, output_path: str) -> str:
+    """Generate a formatted Word document from the research report."""
+    # Opening the prepared template skips rebuilding styles and the title
+    doc = Document(io.BytesIO(_report_template()))
 
     # Metadata section
     doc.add_paragraph()
@@ -750,104 +1253,78 @@ def generate_word_document(bakery_location: str, report_content: str, output_pat
     return output_path
 
 
-def add_formatted_content(doc: Document, content: str):
-    """Add formatted content to the Word document, parsing markdown-like formatting."""
-    import re
-    lines = content.split('\n')
-
-    for line in lines:
-        stripped = line.strip()
+def get_cached_report(location: str) -> Optional[dict]:
+    """Return the results of a recent research run for this location, if any."""
+    key = _normalize_query(location)
+    with _REPORT_CACHE_LOCK:
+        results, stored_at = _REPORT_CACHE.get(key, (None, 0))
+    if not results or time.monotonic() - stored_at > REPORT_CACHE_TTL:
+        return None
+    # The document may have been cleaned out of outputs/ since
+    if not Path(results['document_path']).exists():
+        return None
+    return results
 
-        if not stripped:
-            doc.add_paragraph()
-            continue
 
-        # Handle headers
-        if stripped.startswith('######'):
-            doc.add_heading(stripped[6:].strip(), level=6)
-        elif stripped.startswith('#####'):
-            doc.add_heading(stripped[5:].strip(), level=5)
-        elif stripped.startswith('####'):
-            doc.add_heading(stripped[4:].strip(), level=4)
-        elif stripped.startswith('###'):
-            doc.add_heading(stripped[3:].strip(), level=3)
-        elif stripped.startswith('##'):
-            doc.add_heading(stripped[2:].strip(), level=2)
-        elif stripped.startswith('#'):
-            doc.add_heading(stripped[1:].strip(), level=1)
-
-        # Handle bullet points
-        elif stripped.startswith('- ') or stripped.startswith('* '):
-            doc.add_paragraph(stripped[2:], style='List Bullet')
-
-        # Handle numbered lists
-        elif len(stripped) > 2 and stripped[0].isdigit() and stripped[1] in '.):':
-            doc.add_paragraph(stripped[2:].strip(), style='List Number')
-
-        # Handle bold text markers
-        elif stripped.startswith('**') and stripped.endswith('**'):
-            para = doc.add_paragraph()
-            para.add_run(stripped[2:-2]).bold = True
-
-        # Regular paragraph
-        else:
-            para = doc.add_paragraph()
-            # Handle inline bold
-            pattern = r'\*\*([^*]+)\*\*'
-            parts = re.split(pattern, stripped)
-
-            for i, part in enumerate(parts):
-                if i % 2 == 0:
-                    para.add_run(part)
-                else:
-                    para.add_run(part).bold = True
+def cache_report(location: str, results: dict):
+    """Remember a finished run's results, dropping expired entries."""
+    now = time.monotonic()
+    with _REPORT_CACHE_LOCK:
+        for key in [k for k, (_, stored_at) in _REPORT_CACHE.items() if now - stored_at > REPORT_CACHE_TTL]:
+            del _REPORT_CACHE[key]
+        _REPORT_CACHE[_normalize_query(location)] = (results, now)
 
 
 def run_research(task_id: str, location: str):
     """Background task to run the research."""
     try:
-        update_task(task_id, {'status': 'running', 'stage': 'prefetch_reviews'})
+        update_task(task_id, {'status': 'running', 'stage': 'prefetch'})
 
         # =================================================================
-        # STAGE 1: Prefetch Google Reviews (5 most recent)
+        # STAGES 1 & 2: Prefetch Google Reviews (5 most recent) and Search
+        # Grounding insights (multi-platform) concurrently
         # =================================================================
-        print(f"[{task_id}] Stage 1: Fetching Google Reviews...")
-        google_reviews = fetch_google_reviews(location)
-
-        if google_reviews.get('success'):
-            print(f"[{task_id}] Got {len(google_reviews.get('reviews', []))} Google reviews")
-            update_task(task_id, {
-                'stage': 'prefetch_search',
-                'google_reviews_count': len(google_reviews.get('reviews', [])),
-                'google_rating': google_reviews.get('rating')
-            })
-        else:
-            print(f"[{task_id}] Google Reviews fetch failed: {google_reviews.get('error')}")
-            update_task(task_id, {'stage': 'prefetch_search', 'google_reviews_error': google_reviews.get('error')})
-
-        # =================================================================
-        # STAGE 2: Prefetch Search Grounding Insights (multi-platform)
-        # =================================================================
-        print(f"[{task_id}] Stage 2: Fetching Search Grounding insights...")
-        search_insights = fetch_search_grounding_insights(location)
+        print(f"[{task_id}] Stages 1-2: Fetching Google Reviews and Search Grounding insights...")
+        last_progress = 0.0
+
+        def insights_progress(chars):
+            # Report streamed grounding progress at most once a second
+            nonlocal last_progress
+            now = time.monotonic()
+            if now - last_progress >= INSIGHTS_PROGRESS_INTERVAL:
+                last_progress = now
+                update_task(task_id, {'insights_chars': chars})
+
+        def record_prefetch(name, result):
+            # Record each prefetch as it lands; reviews usually beat grounding
+            if name == 'google_reviews':
+                if result.get('success'):
+                    print(f"[{task_id}] Got {len(result.get('reviews', []))} Google reviews")
+                    update_task(task_id, {
+                        'google_reviews_count': len(result.get('reviews', [])),
+                        'google_rating': result.get('rating')
+                    })
+                else:
+                    print(f"[{task_id}] Google Reviews fetch failed: {result.get('error')}")
+                    update_task(task_id, {'google_reviews_error': result.get('error')})
+            else:
+                if result.get('success'):
+                    print(f"[{task_id}] Got search insights from {len(result.get('sources', []))} sources")
+                    update_task(task_id, {'search_sources_count': len(result.get('sources', []))})
+                else:
+                    print(f"[{task_id}] Search Grounding failed: {result.get('error')}")
+                    update_task(task_id, {'search_error': result.get('error')})
 
-        if search_insights.get('success'):
-            print(f"[{task_id}] Got search insights from {len(search_insights.get('sources', []))} sources")
-            update_task(task_id, {
-                'stage': 'deep_research',
-                'search_sources_count': len(search_insights.get('sources', []))
-            })
-        else:
-            print(f"[{task_id}] Search Grounding failed: {search_insights.get('error')}")
-            update_task(task_id, {'stage': 'deep_research', 'search_error': search_insights.get('error')})
+        google_reviews, search_insights = prefetch_location_data(
+            location, insights_progress, record_prefetch
+        )
 
         # =================================================================
         # STAGE 3: Run Deep Research with prefetched data
         # =================================================================
         print(f"[{task_id}] Stage 3: Starting Deep Research...")
 
-        # Initialize the Google client
-        client = genai.Client()
+        client = get_client()
 
         # Create the research interaction with prefetched data
         prompt = build_research_prompt(location, google_reviews, search_insights)
@@ -857,62 +1334,55 @@ def run_research(task_id: str, location: str):
             background=True
         )
 
-        update_task(task_id, {'interaction_id': interaction.id})
+        # Stage change and interaction id in one write
+        update_task(task_id, {'stage': 'deep_research', 'interaction_id': interaction.id})
 
-        # Poll for results
-        max_poll_time = 3600  # 60 minutes
-        poll_interval = 15
-        start_time = time.time()
-
-        while True:
-            elapsed = time.time() - start_time
-
-            if elapsed > max_poll_time:
-                update_task(task_id, {
-                    'status': 'failed',
-                    'error': 'Research exceeded maximum time limit'
-                })
-                return
-
-            interaction = client.interactions.get(interaction.id)
+        # Poll for results, backing off while the agent is still working
+        try:
+            interaction = poll_interaction(client, interaction.id, MAX_RESEARCH_TIME)
+        except TimeoutError:
+            update_task(task_id, {
+                'status': 'failed',
+                'error': 'Research exceeded maximum time limit'
+            })
+            return
 
-            if interaction.status == "completed":
-                if interaction.outputs:
-                    report = interaction.outputs[-1].text
+        if interaction.status == "failed":
+            update_task(task_id, {
+                'status': 'failed',
+                'error': getattr(interaction, 'error', 'Unknown error')
+            })
+            return
 
-                    # Generate Word document
-                    OUTPUTS_DIR.mkdir(exist_ok=True)
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    safe_location = "".join(c if c.isalnum() or c in ' -_' else '_' for c in location)[:50]
-                    doc_path = OUTPUTS_DIR / f"COBS_Research_{safe_location}_{timestamp}.docx"
+        if not interaction.outputs:
+            update_task(task_id, {
+                'status': 'failed',
+                'error': 'Research completed but no output received'
+            })
+            return
 
-                    generate_word_document(location, report, str(doc_path))
+        report = interaction.outputs[-1].text
 
-                    # Extract sentiment data for UI display
-                    sentiment_data = extract_sentiment_data(report)
+        # Generate Word document
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        safe_location = safe_filename(location)
+        doc_path = OUTPUTS_DIR / f"COBS_Research_{safe_location}_{timestamp}.docx"
 
-                    update_task(task_id, {
-                        'status': 'completed',
-                        'report': report,
-                        'report_length': len(report),
-                        'document_path': str(doc_path),
-                        'sentiment': sentiment_data
-                    })
-                else:
-                    update_task(task_id, {
-                        'status': 'failed',
-                        'error': 'Research completed but no output received'
-                    })
-                return
+        # Build off the request-serving thread (or gevent hub) on the small docx pool
+        doc_future = DOC_EXECUTOR.submit(generate_word_document, location, report, str(doc_path))
 
-            elif interaction.status == "failed":
-                update_task(task_id, {
-                    'status': 'failed',
-                    'error': getattr(interaction, 'error', 'Unknown error')
-                })
-                return
+        # Extract sentiment data for UI display while the document builds
+        sentiment_data = extract_sentiment_data(report)
+        doc_future.result()
 
-            time.sleep(poll_interval)
+        # The report itself lives in the document; tasks only keep metadata
+        results = {
+            'report_length': len(report),
+            'document_path': str(doc_path),
+            'sentiment': sentiment_data
+        }
+        update_task(task_id, {'status': 'completed', **results})
+        cache_report(location, results)
 
     except Exception as e:
         update_task(task_id, {
@@ -928,18 +1398,24 @@ def index():
     return render_template('index.html')
 
 
-@app.route('/favicon.ico')
-def favicon():
-    """Serve favicon - COBS brand color bread icon."""
-    # SVG favicon with COBS brand color
-    svg = '''<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 32 32">
+# SVG favicon with COBS brand color
+_FAVICON_SVG = b'''<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 32 32">
         <circle cx="16" cy="16" r="15" fill="#862633"/>
         <ellipse cx="16" cy="16" rx="10" ry="7" fill="#D4A574"/>
         <ellipse cx="16" cy="14" rx="8" ry="5" fill="#E8CDB0"/>
         <path d="M10 16 Q16 12 22 16" stroke="#862633" stroke-width="1" fill="none"/>
         <path d="M12 15 Q16 11 20 15" stroke="#862633" stroke-width="0.5" fill="none"/>
     </svg>'''
-    return Response(svg, mimetype='image/svg+xml')
+_FAVICON_ETAG = hashlib.md5(_FAVICON_SVG).hexdigest()
+_FAVICON_HEADERS = {'Cache-Control': 'public, max-age=31536000, immutable'}
+
+
+@app.route('/favicon.ico')
+def favicon():
+    """Serve favicon - COBS brand color bread icon."""
+    response = Response(_FAVICON_SVG, mimetype='image/svg+xml', headers=_FAVICON_HEADERS)
+    response.set_etag(_FAVICON_ETAG)
+    return response.make_conditional(request)
 
 
 @app.route('/api/research', methods=['POST'])
@@ -955,29 +1431,113 @@ def start_research():
     if not os.environ.get('GOOGLE_API_KEY'):
         return jsonify({'error': 'Google API key not configured. Please add GOOGLE_API_KEY environment variable.'}), 500
 
-    # Create task
+    # Researched recently: answer from the cache without taking a worker.
+    # Otherwise reject instead of queueing when every research worker is busy
+    cached = get_cached_report(location)
+    if not cached and not _reserve_research(1, RESEARCH_WORKERS):
+        return jsonify({'error': 'Too many research tasks are running. Please try again in a few minutes.'}), 429
+
+    task = _start_research_task(location, cached)
+
+    return jsonify({
+        'task_id': task['id'],
+        'status': task['status'],
+        'message': 'Research started'
+    })
+
+
+@app.route('/api/research/batch', methods=['POST'])
+def start_research_batch():
+    """Start research tasks for several locations at once."""
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    locations = data.get('locations') or []
+    if not isinstance(locations, list):
+        return jsonify({'error': 'Locations must be a list'}), 400
+
+    # Drop blanks and repeats, keeping the submitted order; repeats match the
+    # way the report cache keys locations, so "Kleinburg" and "kleinburg" run once
+    unique = {}
+    for loc in locations:
+        if isinstance(loc, str) and loc.strip():
+            unique.setdefault(_normalize_query(loc), loc.strip())
+    locations = list(unique.values())
+    if not locations:
+        return jsonify({'error': 'At least one location is required'}), 400
+
+    # Only locations without a recent report need research
+    cached = {loc: get_cached_report(loc) for loc in locations}
+    misses = sum(1 for loc in locations if not cached[loc])
+
+    if not os.environ.get('GOOGLE_API_KEY'):
+        return jsonify({'error': 'Google API key not configured. Please add GOOGLE_API_KEY environment variable.'}), 500
+
+    # Misses queue on EXECUTOR, which bounds how many run at once; the batch
+    # is refused only if it would push the backlog past RESEARCH_QUEUE_LIMIT
+    if misses and not _reserve_research(misses, RESEARCH_QUEUE_LIMIT):
+        return jsonify({'error': 'Too many research tasks are queued. Please try again in a few minutes.'}), 429
+
+    tasks = [
+        {'task_id': _start_research_task(loc, cached[loc])['id'], 'location': loc}
+        for loc in locations
+    ]
+
+    return jsonify({
+        'tasks': tasks,
+        'status': 'pending',
+        'message': f'Research started for {len(tasks)} locations'
+    })
+
+
+def _reserve_research(count: int, limit: int) -> bool:
+    """Reserve count research runs, unless that takes the in-flight total past limit."""
+    global _research_in_flight
+    with _research_lock:
+        if _research_in_flight + count > limit:
+            return False
+        _research_in_flight += count
+        return True
+
+
+def _release_research(_future=None):
+    """Mark one research run finished; used as an EXECUTOR done callback."""
+    global _research_in_flight
+    with _research_lock:
+        _research_in_flight -= 1
+
+
+def _start_research_task(location: str, cached: Optional[dict] = None) -> dict:
+    """
+    Create a task for location.
+
+    With cached results from get_cached_report the task completes
+    immediately; otherwise it goes to the research pool, and the caller
+    must have reserved it with _reserve_research; it is released when the
+    research finishes.
+    """
     task_id = str(uuid.uuid4())
     task_data = {
         'id': task_id,
         'location': location,
         'status': 'pending',
         'created_at': datetime.now().isoformat(),
-        'report': None,
         'document_path': None,
         'error': None
     }
-    create_task(task_id, task_data)
 
-    # Start background task
-    thread = threading.Thread(target=run_research, args=(task_id, location))
-    thread.daemon = True
-    thread.start()
+    if cached:
+        task_data.update(cached, status='completed', cached=True)
+        create_task(task_id, task_data)
+        return task_data
 
-    return jsonify({
-        'task_id': task_id,
-        'status': 'pending',
-        'message': 'Research started'
-    })
+    create_task(task_id, task_data)
+    # Snapshot before the worker starts updating the stored task
+    started = dict(task_data)
+
+    future = EXECUTOR.submit(run_research, task_id, location)
+    future.add_done_callback(_release_research)
+    return started
 
 
 @app.route('/api/research/<task_id>')
@@ -988,21 +1548,38 @@ def get_research_status(task_id):
     if not task:
         return jsonify({'error': 'Task not found. The task may have expired or the server was restarted.'}), 404
 
-    response = {
-        'task_id': task_id,
-        'status': task['status'],
-        'location': task['location']
-    }
+    return jsonify(status_payload(task_id, task))
 
-    if task['status'] == 'completed':
-        response['report_length'] = task.get('report_length', 0)
-        response['document_path'] = task.get('document_path')
-        response['sentiment'] = task.get('sentiment', {})
 
-    if task['status'] == 'failed':
-        response['error'] = task.get('error', 'Unknown error')
+@app.route('/api/research/<task_id>/stream')
+def stream_research_status(task_id):
+    """Stream status updates for a research task as server-sent events."""
+    if not get_task(task_id):
+        return jsonify({'error': 'Task not found. The task may have expired or the server was restarted.'}), 404
 
-    return jsonify(response)
+    # Subscribe before reading the current state so no update is missed
+    updates = _subscribe(task_id)
+
+    def generate():
+        try:
+            payload = status_payload(task_id, get_task(task_id))
+            yield b'data: ' + json_dumps(payload) + b'\n\n'
+
+            while payload['status'] not in TERMINAL_STATUSES:
+                try:
+                    payload = updates.get(timeout=SSE_KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield b': keepalive\n\n'
+                    continue
+                yield b'data: ' + json_dumps(payload) + b'\n\n'
+        finally:
+            _unsubscribe(task_id, updates)
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @app.route('/api/download/<task_id>')
@@ -1020,11 +1597,16 @@ def download_document(task_id):
     if not doc_path or not Path(doc_path).exists():
         return jsonify({'error': 'Document not found'}), 404
 
+    # Reports never change once written, so let clients revalidate with 304s
     return send_file(
         doc_path,
         as_attachment=True,
         download_name=Path(doc_path).name,
-        mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+        mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+        conditional=True,
+        etag=True,
+        last_modified=os.path.getmtime(doc_path),
+        max_age=3600
     )
 
 
@@ -1035,9 +1617,6 @@ def health():
 
 
 if __name__ == '__main__':
-    # Create outputs directory
-    OUTPUTS_DIR.mkdir(exist_ok=True)
-
     # Run the app
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_DEBUG', 'false').lower() == 'true'
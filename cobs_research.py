@@ -6,45 +6,226 @@ Uses Google Deep Research API to analyze bakery reviews across all social media
 
 import time
 import os
+import re
 import sys
 import argparse
+import threading
 from datetime import datetime
 from typing import Optional
 from pathlib import Path
+from xml.sax.saxutils import escape as xml_escape
 
+try:
+    import orjson
+except ImportError:  # no wheel for this platform; fall back to the stdlib
+    import json
+    orjson = None
 from dotenv import load_dotenv
 from google import genai
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
 from docx.shared import Inches, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.style import WD_STYLE_TYPE
 
+# Markdown headers (level from the run of '#'), numbered list items and
+# inline **bold** spans
+_HEADER_RE = re.compile(r'(#{1,6})\s*(.*)')
+_NUM_RE = re.compile(r'(?:\d{1,2}[.)]|\d:)\s+(.*)')  # not years like '2024:'
+_BOLD_INLINE_RE = re.compile(r'\*\*([^*]+)\*\*')
 
-class COBSBreadResearcher:
-    """Deep research engine for COBS Bread bakery reviews."""
 
-    AGENT_ID = "deep-research-pro-preview-12-2025"
-    MAX_POLL_TIME = 3600  # 60 minutes max
-    POLL_INTERVAL = 15  # seconds
+def json_dumps(obj, indent: bool = False) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode()
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode()
 
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize the researcher with Google API credentials."""
-        if api_key:
-            os.environ["GOOGLE_API_KEY"] = api_key
 
-        if not os.environ.get("GOOGLE_API_KEY"):
-            raise ValueError(
-                "Google API key required. Set GOOGLE_API_KEY environment variable "
-                "or pass api_key parameter."
+def json_loads(data):
+    """Parse JSON bytes or str; raises ValueError on malformed input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dig(data, *path, default=None):
+    """Follow dict keys and list indexes into parsed JSON, or return default."""
+    for key in path:
+        try:
+            data = data[key]
+        except (KeyError, IndexError, TypeError):
+            return default
+    return data
+
+
+def cache_read(path: Path, ttl: float):
+    """Return the JSON cached at path if it is younger than ttl seconds."""
+    try:
+        if time.time() - path.stat().st_mtime < ttl:
+            return json_loads(path.read_bytes())
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def cache_write(path: Path, data) -> None:
+    """Atomically write data to path as JSON; a failed write only loses the cache."""
+    # Per-thread temp name: pooled callers can write the same entry at once
+    tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path.write_bytes(json_dumps(data))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error writing cache {path}: {e}")
+
+
+class _SafeFilenameTable(dict):
+    """str.translate table mapping anything but alphanumerics and ' -_' to '_'."""
+
+    def __missing__(self, codepoint):
+        char = chr(codepoint)
+        self[codepoint] = codepoint if char.isalnum() or char in ' -_' else ord('_')
+        return self[codepoint]
+
+
+_SAFE_FILENAME_TABLE = _SafeFilenameTable()
+
+
+def safe_filename(location: str) -> str:
+    """Location reduced to a filename-safe fragment of at most 50 characters."""
+    return location.translate(_SAFE_FILENAME_TABLE)[:50]
+
+
+def _classify_line(stripped: str) -> tuple:
+    """Map a stripped report line to (style name or None, [(text, bold), ...])."""
+    if not stripped:
+        return None, ()
+
+    # Most lines are plain prose, so branch on the first character
+    # before trying any of the markdown prefixes
+    first = stripped[0]
+
+    # Headers
+    if first == '#':
+        header = _HEADER_RE.match(stripped)
+        return f'Heading {len(header.group(1))}', [(header.group(2), False)]
+
+    # Bullet points
+    if first in '-*' and stripped[1:2] == ' ':
+        return 'List Bullet', [(stripped[2:], False)]
+
+    # Numbered lists
+    if first.isdigit():
+        number = _NUM_RE.match(stripped)
+        if number:
+            return 'List Number', [(number.group(1), False)]
+
+    # Bold text markers
+    if first == '*' and stripped.startswith('**') and stripped.endswith('**'):
+        return None, [(stripped[2:-2], True)]
+
+    # Regular paragraph with inline bold
+    parts = _BOLD_INLINE_RE.split(stripped)
+    return None, [(part, i % 2 == 1) for i, part in enumerate(parts)]
+
+
+def _paragraph_xml(runs, style_id=None) -> str:
+    """Serialize a <w:p> with (text, bold) runs."""
+    xml = ['<w:p>']
+    if style_id:
+        xml.append(f'<w:pPr><w:pStyle w:val="{style_id}"/></w:pPr>')
+
+    for text, bold in runs:
+        if not text:
+            continue
+        xml.append('<w:r><w:rPr><w:b/></w:rPr>' if bold else '<w:r>')
+        if text[0].isspace() or text[-1].isspace():
+            xml.append(f'<w:t xml:space="preserve">{xml_escape(text)}</w:t></w:r>')
+        else:
+            xml.append(f'<w:t>{xml_escape(text)}</w:t></w:r>')
+
+    xml.append('</w:p>')
+    return ''.join(xml)
+
+
+def add_formatted_content(doc: Document, content: str):
+    """Add formatted content to the Word document, parsing markdown-like formatting."""
+    # First pass: classify every line without touching the document
+    tokens = [_classify_line(line.strip()) for line in content.split('\n')]
+
+    # Second pass: serialize all paragraphs and parse them in one lxml call,
+    # which is much cheaper than building each element node by node
+    style_ids = {None: None}
+    for style_name, _ in tokens:
+        if style_name not in style_ids:
+            style_ids[style_name] = doc.styles[style_name].style_id
+    xml = ''.join(_paragraph_xml(runs, style_ids[style_name]) for style_name, runs in tokens)
+    fragment = parse_xml(f'<w:body {nsdecls("w")}>{xml}</w:body>')
+
+    # Splice everything into the body in one go, keeping sectPr last
+    body = doc.element.body
+    sect_pr = body.find(qn('w:sectPr'))
+    body.extend(fragment)
+    if sect_pr is not None:
+        body.append(sect_pr)
+
+
+def poll_interaction(client, interaction_id: str, max_wait: float,
+                     initial_interval: float = 2, max_interval: float = 15,
+                     on_status=None):
+    """
+    Poll a background Deep Research interaction until it finishes.
+
+    Polls quickly at first so short jobs are picked up promptly, then backs
+    off by 1.5x per poll up to max_interval.
+
+    Args:
+        client: Google GenAI client
+        interaction_id: ID returned by client.interactions.create
+        max_wait: Seconds to wait before giving up
+        initial_interval: Seconds to wait after the first poll
+        max_interval: Upper bound on the wait between polls
+        on_status: Optional callback(status, elapsed) run when the status changes
+
+    Returns:
+        The interaction, with status "completed" or "failed"
+    """
+    start_time = time.time()
+    interval = initial_interval
+    last_status = None
+
+    while True:
+        elapsed = time.time() - start_time
+
+        if elapsed > max_wait:
+            raise TimeoutError(
+                f"Research exceeded maximum time of {max_wait/60} minutes"
             )
 
-        self.client = genai.Client()
-        self.results = {}
+        interaction = client.interactions.get(interaction_id)
+        status = interaction.status
 
-    def _build_research_prompt(self, bakery_location: str) -> str:
-        """Build comprehensive research prompt for COBS Bread bakery analysis."""
-        return f"""
-You are conducting an exhaustive deep research analysis of customer reviews for the COBS Bread bakery located at: {bakery_location}
+        if status != last_status:
+            last_status = status
+            if on_status:
+                on_status(status, elapsed)
+
+        if status in ("completed", "failed"):
+            return interaction
+
+        time.sleep(interval)
+        interval = min(interval * 1.5, max_interval)
+
+
+# Static body of the Deep Research prompt; filled in by _build_research_prompt.
+# The location goes last so the instructions form a cacheable prefix.
+_RESEARCH_PROMPT_TEMPLATE = """
+You are conducting an exhaustive deep research analysis of customer reviews for a single COBS Bread bakery location, given in the TARGET section at the end of these instructions.
 
 Your task is to find and analyze ALL available reviews across EVERY social media platform and review site. Be extremely thorough and comprehensive.
 
@@ -216,8 +397,37 @@ Provide specific, actionable recommendations for:
 - Flag any data limitations or gaps in available information
 
 Remember: This research will inform critical business decisions. Leave no stone unturned.
+
+# TARGET
+**BAKERY LOCATION:** {location}
 """
 
+
+class COBSBreadResearcher:
+    """Deep research engine for COBS Bread bakery reviews."""
+
+    AGENT_ID = "deep-research-pro-preview-12-2025"
+    MAX_POLL_TIME = 3600  # 60 minutes max
+    POLL_INTERVAL = 15  # seconds, upper bound once polling has backed off
+
+    def __init__(self, api_key: Optional[str] = None):
+        """Initialize the researcher with Google API credentials."""
+        if api_key:
+            os.environ["GOOGLE_API_KEY"] = api_key
+
+        if not os.environ.get("GOOGLE_API_KEY"):
+            raise ValueError(
+                "Google API key required. Set GOOGLE_API_KEY environment variable "
+                "or pass api_key parameter."
+            )
+
+        self.client = genai.Client()
+        self.results = {}
+
+    def _build_research_prompt(self, bakery_location: str) -> str:
+        """Build comprehensive research prompt for COBS Bread bakery analysis."""
+        return _RESEARCH_PROMPT_TEMPLATE.format(location=bakery_location)
+
     def conduct_research(self, bakery_location: str, verbose: bool = True) -> str:
         """
         Conduct deep research on the specified COBS Bread bakery.
@@ -255,43 +465,36 @@ Remember: This research will inform critical business decisions. Leave no stone
             print("Polling for results...\n")
 
         # Poll for results
-        start_time = time.time()
-        last_status = None
-
-        while True:
-            elapsed = time.time() - start_time
-
-            if elapsed > self.MAX_POLL_TIME:
-                raise TimeoutError(
-                    f"Research exceeded maximum time of {self.MAX_POLL_TIME/60} minutes"
-                )
-
-            interaction = self.client.interactions.get(interaction_id)
+        def print_status(status, elapsed):
+            if verbose:
+                mins = int(elapsed // 60)
+                secs = int(elapsed % 60)
+                print(f"[{mins:02d}:{secs:02d}] Status: {status}")
 
-            if interaction.status != last_status:
-                last_status = interaction.status
-                if verbose:
-                    mins = int(elapsed // 60)
-                    secs = int(elapsed % 60)
-                    print(f"[{mins:02d}:{secs:02d}] Status: {interaction.status}")
-
-            if interaction.status == "completed":
-                if verbose:
-                    print(f"\nResearch completed in {elapsed/60:.1f} minutes!")
+        start_time = time.time()
+        interaction = poll_interaction(
+            self.client,
+            interaction_id,
+            self.MAX_POLL_TIME,
+            max_interval=self.POLL_INTERVAL,
+            on_status=print_status
+        )
+        elapsed = time.time() - start_time
 
-                # Extract the final report
-                if interaction.outputs:
-                    report = interaction.outputs[-1].text
-                    self.results[bakery_location] = report
-                    return report
-                else:
-                    raise ValueError("Research completed but no output received")
+        if interaction.status == "failed":
+            error_msg = getattr(interaction, 'error', 'Unknown error')
+            raise RuntimeError(f"Research failed: {error_msg}")
 
-            elif interaction.status == "failed":
-                error_msg = getattr(interaction, 'error', 'Unknown error')
-                raise RuntimeError(f"Research failed: {error_msg}")
+        if verbose:
+            print(f"\nResearch completed in {elapsed/60:.1f} minutes!")
 
-            time.sleep(self.POLL_INTERVAL)
+        # Extract the final report
+        if interaction.outputs:
+            report = interaction.outputs[-1].text
+            self.results[bakery_location] = report
+            return report
+        else:
+            raise ValueError("Research completed but no output received")
 
     def generate_word_document(
         self,
@@ -312,7 +515,7 @@ Remember: This research will inform critical business decisions. Leave no stone
         """
         if not output_path:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            safe_location = "".join(c if c.isalnum() or c in ' -_' else '_' for c in bakery_location)[:50]
+            safe_location = safe_filename(bakery_location)
             output_path = f"COBS_Research_{safe_location}_{timestamp}.docx"
 
         doc = Document()
@@ -366,64 +569,7 @@ Remember: This research will inform critical business decisions. Leave no stone
 
     def _add_formatted_content(self, doc: Document, content: str):
         """Add formatted content to the Word document, parsing markdown-like formatting."""
-        lines = content.split('\n')
-        current_list_level = 0
-
-        for line in lines:
-            stripped = line.strip()
-
-            if not stripped:
-                doc.add_paragraph()
-                continue
-
-            # Handle headers
-            if stripped.startswith('######'):
-                doc.add_heading(stripped[6:].strip(), level=6)
-            elif stripped.startswith('#####'):
-                doc.add_heading(stripped[5:].strip(), level=5)
-            elif stripped.startswith('####'):
-                doc.add_heading(stripped[4:].strip(), level=4)
-            elif stripped.startswith('###'):
-                doc.add_heading(stripped[3:].strip(), level=3)
-            elif stripped.startswith('##'):
-                doc.add_heading(stripped[2:].strip(), level=2)
-            elif stripped.startswith('#'):
-                doc.add_heading(stripped[1:].strip(), level=1)
-
-            # Handle bullet points
-            elif stripped.startswith('- ') or stripped.startswith('* '):
-                para = doc.add_paragraph(stripped[2:], style='List Bullet')
-
-            # Handle numbered lists
-            elif len(stripped) > 2 and stripped[0].isdigit() and stripped[1] in '.):':
-                para = doc.add_paragraph(stripped[2:].strip(), style='List Number')
-
-            # Handle bold text markers
-            elif stripped.startswith('**') and stripped.endswith('**'):
-                para = doc.add_paragraph()
-                para.add_run(stripped[2:-2]).bold = True
-
-            # Regular paragraph
-            else:
-                para = doc.add_paragraph()
-                # Handle inline bold
-                self._add_inline_formatting(para, stripped)
-
-    def _add_inline_formatting(self, paragraph, text: str):
-        """Handle inline bold and italic formatting."""
-        import re
-
-        # Pattern for **bold** text
-        pattern = r'\*\*([^*]+)\*\*'
-        parts = re.split(pattern, text)
-
-        for i, part in enumerate(parts):
-            if i % 2 == 0:
-                # Regular text
-                paragraph.add_run(part)
-            else:
-                # Bold text
-                paragraph.add_run(part).bold = True
+        add_formatted_content(doc, content)
 
 
 def main():
@@ -36,6 +36,7 @@ class COBSResearchApp {
 
         this.taskId = null;
         this.pollInterval = null;
+        this.eventSource = null;
         this.startTime = null;
         this.elapsedInterval = null;
         this.pollErrorCount = 0;
@@ -117,6 +118,23 @@ class COBSResearchApp {
     }
 
     startPolling() {
+        // Prefer server-sent status updates; fall back to polling
+        if (window.EventSource) {
+            this.eventSource = new EventSource(`/api/research/${this.taskId}/stream`);
+            this.eventSource.onmessage = (e) => this.handleStatus(JSON.parse(e.data));
+            this.eventSource.onerror = () => {
+                // The browser retries on its own unless the stream was closed for good
+                if (this.eventSource && this.eventSource.readyState === EventSource.CLOSED) {
+                    this.eventSource = null;
+                    this.startIntervalPolling();
+                }
+            };
+            return;
+        }
+        this.startIntervalPolling();
+    }
+
+    startIntervalPolling() {
         // Poll every 5 seconds
         this.pollInterval = setInterval(() => this.checkStatus(), 5000);
         // Also check immediately
@@ -124,6 +142,10 @@ class COBSResearchApp {
     }
 
     stopPolling() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
         if (this.pollInterval) {
             clearInterval(this.pollInterval);
             this.pollInterval = null;
@@ -159,15 +181,7 @@ class COBSResearchApp {
             // Reset error count on successful response
             this.pollErrorCount = 0;
 
-            this.updateProgressUI(data);
-
-            if (data.status === 'completed') {
-                this.stopPolling();
-                this.showResults(data);
-            } else if (data.status === 'failed') {
-                this.stopPolling();
-                this.showError(data.error || 'Research failed');
-            }
+            this.handleStatus(data);
 
         } catch (error) {
             console.error('Polling error:', error);
@@ -179,6 +193,18 @@ class COBSResearchApp {
         }
     }
 
+    handleStatus(data) {
+        this.updateProgressUI(data);
+
+        if (data.status === 'completed') {
+            this.stopPolling();
+            this.showResults(data);
+        } else if (data.status === 'failed') {
+            this.stopPolling();
+            this.showError(data.error || 'Research failed');
+        }
+    }
+
     updateProgressUI(data) {
         const statusMessages = {
             'pending': 'Initializing research agent...',
@@ -188,7 +214,9 @@ class COBSResearchApp {
             'failed': 'Research failed'
         };
 
-        this.progressStatus.textContent = statusMessages[data.status] || data.status;
+        this.progressStatus.textContent = data.status === 'running'
+            ? this.describeStage(data)
+            : statusMessages[data.status] || data.status;
         this.statusBadge.textContent = data.status.charAt(0).toUpperCase() + data.status.slice(1);
 
         // Estimate progress based on elapsed time (max ~20 mins typical)
@@ -197,6 +225,32 @@ class COBSResearchApp {
         this.progressBar.style.width = `${estimatedProgress}%`;
     }
 
+    describeStage(data) {
+        // Summarize what the prefetch stage has gathered so far
+        const found = [];
+        if (data.google_reviews_count != null) {
+            const rating = data.google_rating ? ` (${data.google_rating}★)` : '';
+            found.push(`${data.google_reviews_count} Google reviews${rating}`);
+        } else if (data.google_reviews_error) {
+            found.push('no Google reviews');
+        }
+        if (data.search_sources_count != null) {
+            found.push(`${data.search_sources_count} web sources`);
+        } else if (data.search_error) {
+            found.push('no web insights');
+        }
+        const summary = found.length ? ` Found ${found.join(', ')}.` : '';
+
+        if (data.stage === 'prefetch') {
+            // Grounding text streams in; show how much has arrived so far
+            const gathered = data.insights_chars
+                ? ` (${data.insights_chars.toLocaleString()} characters of web insights so far)`
+                : '';
+            return `Gathering Google reviews and web insights${gathered}...${summary}`;
+        }
+        return `Analyzing reviews across platforms...${summary}`;
+    }
+
     showResults(data) {
         this.setLoading(false);
         this.progressSection.classList.add('hidden');
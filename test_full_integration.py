@@ -10,9 +10,22 @@ load_dotenv()
 
 # Import functions directly (avoid Flask import issues)
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cobs_research import dig
 
 GROUNDING_MODEL = "gemini-2.5-flash"
 
+# One pooled session so the Places and Gemini calls reuse TLS connections
+_HTTP = requests.Session()
+_HTTP.headers['User-Agent'] = 'cobs-bread-research-integration-test'
+_HTTP.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=50,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504])
+))
+
 def find_place_id(query: str) -> str:
     api_key = os.environ.get('GOOGLE_PLACES_API_KEY')
     url = "https://places.googleapis.com/v1/places:searchText"
@@ -21,7 +34,7 @@ def find_place_id(query: str) -> str:
         "X-Goog-Api-Key": api_key,
         "X-Goog-FieldMask": "places.id,places.displayName,places.formattedAddress"
     }
-    response = requests.post(url, json={"textQuery": query}, headers=headers, timeout=30)
+    response = _HTTP.post(url, json={"textQuery": query}, headers=headers, timeout=30)
     if response.status_code == 200:
         places = response.json().get("places", [])
         if places:
@@ -41,7 +54,7 @@ def fetch_google_reviews(location: str) -> dict:
         "reviews_sort": "newest",
         "key": api_key
     }
-    response = requests.get(url, params=params, timeout=30)
+    response = _HTTP.get(url, params=params, timeout=30)
     data = response.json()
     if data.get("status") != "OK":
         return {'success': False, 'error': data.get('status')}
@@ -71,12 +84,12 @@ def fetch_search_insights(location: str) -> dict:
         "contents": [{"role": "user", "parts": [{"text": prompt}]}],
         "tools": [{"googleSearch": {}}]
     }
-    response = requests.post(url, json=payload, headers={"Content-Type": "application/json"}, timeout=90)
+    response = _HTTP.post(url, json=payload, headers={"Content-Type": "application/json"}, timeout=90)
     if response.status_code != 200:
         return {'success': False, 'error': f'API error: {response.status_code}'}
 
     data = response.json()
-    text = data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
+    text = dig(data, "candidates", 0, "content", "parts", 0, "text", default="")
     return {'success': True, 'insights': text[:1000] + "..."}  # Truncate for display
 
 
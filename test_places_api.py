@@ -5,37 +5,104 @@ Returns up to 5 reviews with full text, author, date, and rating.
 """
 
 import os
+import sys
 import json
+import atexit
+import hashlib
+import functools
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from pathlib import Path
+from types import MappingProxyType
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+from cobs_research import cache_read, cache_write, json_dumps, json_loads
+
 load_dotenv()
 
+
 PLACES_API_KEY = os.environ.get('GOOGLE_PLACES_API_KEY')
 GEMINI_API_KEY = os.environ.get('GOOGLE_API_KEY')
 
+PLACES_SEARCH_URL = "https://places.googleapis.com/v1/places:searchText"
+PLACES_LEGACY_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+PLACES_DETAILS_URL = "https://places.googleapis.com/v1/places/{place_id}"
+
+# (connect, read) seconds; a stalled endpoint fails and is retried instead of hanging
+_TIMEOUT = (3.05, 27)
+
+# Response fields to request; only what the script actually prints
+_LEGACY_FIELDS = "name,formatted_address,formatted_phone_number,rating,user_ratings_total,opening_hours,reviews"
+_NEW_FIELDS = "rating,userRatingCount,reviews"
+
+# Per-endpoint headers, built once and shared read-only by every call
+_SEARCH_HEADERS = MappingProxyType({
+    "X-Goog-Api-Key": PLACES_API_KEY,
+    "X-Goog-FieldMask": "places.id,places.displayName,places.formattedAddress"
+})
+_DETAILS_HEADERS = MappingProxyType({
+    "X-Goog-Api-Key": PLACES_API_KEY,
+    "X-Goog-FieldMask": _NEW_FIELDS
+})
+
+# One pooled session so repeat calls to the Places hosts reuse TLS connections;
+# rate limits and transient errors are retried with backoff, honoring Retry-After
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=1,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({'GET', 'POST'}),
+        raise_on_status=False
+    )
+))
+SESSION.headers.update({"Content-Type": "application/json"})
+atexit.register(SESSION.close)
+
+# Repeat runs read responses from disk instead of spending API quota
+CACHE_DIR = Path('.cache') / 'places_test'
+
+
+def file_cache(ttl: float):
+    """Cache a helper's JSON result on disk for ttl seconds; failures (None) are not cached."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = json.dumps([func.__name__, args, sorted(kwargs.items())])
+            path = CACHE_DIR / f"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}.json"
+            cached = cache_read(path, ttl)
+            if cached is not None:
+                return cached
+
+            result = func(*args, **kwargs)
+            if result is not None:
+                cache_write(path, result)
+            return result
+        return wrapper
+    return decorator
+
+
+@file_cache(ttl=24 * 3600)
 def find_place_id(query: str) -> str:
     """Find Place ID using Text Search."""
-    url = "https://places.googleapis.com/v1/places:searchText"
-
-    headers = {
-        "Content-Type": "application/json",
-        "X-Goog-Api-Key": PLACES_API_KEY,
-        "X-Goog-FieldMask": "places.id,places.displayName,places.formattedAddress"
-    }
-
     payload = {
         "textQuery": query
     }
 
-    response = requests.post(url, json=payload, headers=headers)
+    response = SESSION.post(PLACES_SEARCH_URL, json=payload, headers=_SEARCH_HEADERS, timeout=_TIMEOUT)
 
     if response.status_code != 200:
         print(f"Error finding place: {response.status_code}")
         print(response.text)
         return None
 
-    data = response.json()
+    data = json_loads(response.content)
     places = data.get("places", [])
 
     if places:
@@ -48,6 +115,7 @@ def find_place_id(query: str) -> str:
     return None
 
 
+@file_cache(ttl=3600)
 def get_place_reviews_legacy(place_id: str, sort_by: str = "newest") -> dict:
     """
     Get place details including reviews using LEGACY API (supports newest sorting).
@@ -57,23 +125,21 @@ def get_place_reviews_legacy(place_id: str, sort_by: str = "newest") -> dict:
         sort_by: "newest" for most recent, "most_relevant" for default sorting
     """
     # Legacy API endpoint with reviews_sort parameter
-    url = "https://maps.googleapis.com/maps/api/place/details/json"
-
     params = {
         "place_id": place_id,
-        "fields": "name,formatted_address,formatted_phone_number,rating,user_ratings_total,opening_hours,reviews",
+        "fields": _LEGACY_FIELDS,
         "reviews_sort": sort_by,
         "key": PLACES_API_KEY
     }
 
-    response = requests.get(url, params=params)
+    response = SESSION.get(PLACES_LEGACY_DETAILS_URL, params=params, timeout=_TIMEOUT)
 
     if response.status_code != 200:
         print(f"Error getting place details: {response.status_code}")
         print(response.text)
         return None
 
-    data = response.json()
+    data = json_loads(response.content)
     if data.get("status") != "OK":
         print(f"API Error: {data.get('status')} - {data.get('error_message', 'Unknown error')}")
         return None
@@ -81,28 +147,85 @@ def get_place_reviews_legacy(place_id: str, sort_by: str = "newest") -> dict:
     return data.get("result", {})
 
 
+@file_cache(ttl=3600)
 def get_place_reviews_new(place_id: str) -> dict:
     """
     Get place details using NEW API (only supports relevance sorting).
     """
-    url = f"https://places.googleapis.com/v1/places/{place_id}"
-
-    headers = {
-        "X-Goog-Api-Key": PLACES_API_KEY,
-        "X-Goog-FieldMask": "id,displayName,formattedAddress,nationalPhoneNumber,rating,userRatingCount,regularOpeningHours,reviews"
-    }
-
-    response = requests.get(url, headers=headers)
+    response = SESSION.get(
+        PLACES_DETAILS_URL.format(place_id=place_id), headers=_DETAILS_HEADERS, timeout=_TIMEOUT
+    )
 
     if response.status_code != 200:
         print(f"Error getting place details: {response.status_code}")
         print(response.text)
         return None
 
-    return response.json()
+    return json_loads(response.content)
+
+
+def fetch_all_reviews(place_id: str) -> tuple:
+    """
+    Fetch legacy (newest-sorted) and new (relevance-sorted) details concurrently.
+
+    Returns (legacy result, new result); either is None if its call failed.
+    """
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        legacy_future = pool.submit(get_place_reviews_legacy, place_id, "newest")
+        new_future = pool.submit(get_place_reviews_new, place_id)
+        return legacy_future.result(), new_future.result()
+
+
+# Display fields of a legacy review, with fallbacks for missing keys
+_REVIEW_DEFAULTS = {
+    'author_name': 'Anonymous',
+    'rating': 'N/A',
+    'relative_time_description': 'Unknown date',
+    'text': 'No text'
+}
+_review_fields = itemgetter(*_REVIEW_DEFAULTS)
+_REVIEW_FORMAT = "\n[{0}] ⭐ {2}/5 - {1} ({3})\n    \"{4}\"\n" + "-" * 70 + "\n"
+
+
+def fetch_newest_reviews(queries: list, max_workers: int = 8) -> dict:
+    """
+    Fetch newest-sorted legacy details for several place queries concurrently.
+
+    Duplicate queries are fetched once. Returns {query: details dict, or
+    {'error': ...}} so one failed lookup doesn't sink the rest of the batch.
+    """
+    def fetch(query):
+        place_id = find_place_id(query)
+        if not place_id:
+            return {'error': 'Could not find place ID'}
+        return get_place_reviews_legacy(place_id, sort_by="newest") or {'error': 'Could not fetch place details'}
+
+    unique = list(dict.fromkeys(queries))
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique) or 1)) as pool:
+        futures = {query: pool.submit(fetch, query) for query in unique}
+        for query, future in futures.items():
+            try:
+                results[query] = future.result()
+            except Exception as e:
+                results[query] = {'error': str(e)}
+    return results
 
 
 if __name__ == "__main__":
+    if not PLACES_API_KEY:
+        sys.exit("GOOGLE_PLACES_API_KEY is not set")
+
+    # Queries on the command line: summarize each location instead
+    if len(sys.argv) > 1:
+        for query, data in fetch_newest_reviews(sys.argv[1:]).items():
+            if 'error' in data:
+                print(f"{query}: ❌ {data['error']}")
+            else:
+                print(f"{query}: {data.get('name', 'N/A')} - {data.get('rating', 'N/A')} "
+                      f"({data.get('user_ratings_total', 0)} reviews, {len(data.get('reviews', []))} newest returned)")
+        sys.exit(0)
+
     print("=" * 70)
     print("GOOGLE PLACES API - Fetching Actual Review Text")
     print("=" * 70)
@@ -115,11 +238,12 @@ if __name__ == "__main__":
         print("Could not find place ID")
         exit(1)
 
-    # Step 2: Get place details with reviews (sorted by NEWEST using Legacy API)
-    print(f"\n2. Fetching NEWEST reviews using Legacy API...")
+    # Step 2: Get place details with reviews (sorted by NEWEST using Legacy API),
+    # fetching the New API details alongside for comparison
+    print(f"\n2. Fetching NEWEST reviews using Legacy API (and New API in parallel)...")
     print("-" * 70)
 
-    data = get_place_reviews_legacy(place_id, sort_by="newest")
+    data, new_data = fetch_all_reviews(place_id)
 
     if not data:
         print("Could not fetch place details")
@@ -131,6 +255,9 @@ if __name__ == "__main__":
     print(f"   Address: {data.get('formatted_address', 'N/A')}")
     print(f"   Phone: {data.get('formatted_phone_number', 'N/A')}")
     print(f"   Rating: {data.get('rating', 'N/A')} ({data.get('user_ratings_total', 0)} reviews)")
+    if new_data:
+        print(f"   New API: {new_data.get('rating', 'N/A')} ({new_data.get('userRatingCount', 0)} reviews, "
+              f"{len(new_data.get('reviews', []))} returned by relevance)")
 
     # Display hours
     hours = data.get('opening_hours', {}).get('weekday_text', [])
@@ -144,19 +271,16 @@ if __name__ == "__main__":
     print(f"\n📝 NEWEST GOOGLE REVIEWS ({len(reviews)} returned, sorted by date):")
     print("=" * 70)
 
-    for i, review in enumerate(reviews, 1):
-        author = review.get('author_name', 'Anonymous')
-        rating = review.get('rating', 'N/A')
-        time = review.get('relative_time_description', 'Unknown date')
-        text = review.get('text', 'No text')
-
-        print(f"\n[{i}] ⭐ {rating}/5 - {author} ({time})")
-        print(f"    \"{text}\"")
-        print("-" * 70)
+    # Build the whole listing and write it once
+    rows = (_review_fields({**_REVIEW_DEFAULTS, **review}) for review in reviews)
+    sys.stdout.write("".join(
+        _REVIEW_FORMAT.format(i, author, rating, when, text)
+        for i, (author, rating, when, text) in enumerate(rows, 1)
+    ))
 
     # Save full response
-    with open('/tmp/places_api_response.json', 'w') as f:
-        json.dump(data, f, indent=2)
+    with open('/tmp/places_api_response.json', 'wb') as f:
+        f.write(json_dumps(data, indent=True))
     print(f"\nFull response saved to /tmp/places_api_response.json")
 
     print("\n✅ Done!")
@@ -5,21 +5,39 @@ Uses Gemini 2.5 Flash with Google Search grounding via REST API.
 """
 
 import os
-import json
+import sys
+import hashlib
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
+from cobs_research import cache_read, cache_write, dig, json_dumps, json_loads
+
 load_dotenv()
 
 API_KEY = os.environ.get('GOOGLE_API_KEY')
 MODEL_ID = "gemini-2.5-flash"
-
-def get_review_insights_search_grounding(location: str):
-    """
-    Get comprehensive review insights using Google Search grounding only.
-    """
-
-    prompt = f"""
+GEMINI_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{MODEL_ID}:generateContent"
+
+# Gemini returns 429 under load; retry it and 5xx with backoff, honoring Retry-After
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(max_retries=Retry(
+    total=5,
+    backoff_factor=1,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset({'POST'}),
+    raise_on_status=False
+)))
+
+# Grounded answers for a location barely change, so repeat runs reuse them
+CACHE_DIR = Path('.cache') / 'grounding_test'
+CACHE_TTL = 24 * 3600
+
+# Static body of the grounding prompt; filled in per location
+_INSIGHTS_PROMPT_TEMPLATE = """
 Search the web thoroughly for ALL reviews and feedback about COBS Bread bakery in {location}.
 
 I need you to find and analyze reviews from:
@@ -76,25 +94,34 @@ Be extremely thorough. Search multiple sources. Quote actual reviews where possi
 Cite which platform each piece of information comes from.
 """
 
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{MODEL_ID}:generateContent?key={API_KEY}"
+
+def fetch_grounding_response(location: str):
+    """
+    Get the grounded generateContent response for location.
+
+    Returns the parsed response, or None on error.
+    """
+    cache_key = hashlib.blake2b(f"{MODEL_ID}\0{location}".encode(), digest_size=16).hexdigest()
+    cache_path = CACHE_DIR / f"{cache_key}.json"
+    data = cache_read(cache_path, CACHE_TTL)
+    if data is not None:
+        print(f"(cached response from {cache_path})")
+        return data
 
     payload = {
         "contents": [{
             "role": "user",
-            "parts": [{"text": prompt}]
+            "parts": [{"text": _INSIGHTS_PROMPT_TEMPLATE.format(location=location)}]
         }],
         "tools": [
             {"googleSearch": {}}
         ]
     }
 
-    print(f"Querying Google Search grounding for COBS Bread in {location}...")
-    print("=" * 70)
-
-    response = requests.post(
-        url,
+    response = SESSION.post(
+        GEMINI_URL,
+        params={"key": API_KEY},
         json=payload,
-        headers={"Content-Type": "application/json"},
         timeout=90
     )
 
@@ -103,10 +130,44 @@ Cite which platform each piece of information comes from.
         print(response.text)
         return None
 
-    data = response.json()
+    data = json_loads(response.content)
+    cache_write(cache_path, data)
+    return data
+
+
+def fetch_grounding_responses(locations: list, max_workers: int = 4) -> dict:
+    """
+    Ground several locations concurrently over the shared session.
+
+    Duplicate locations are queried once. Returns {location: parsed
+    response, or None if that request failed}.
+    """
+    unique = list(dict.fromkeys(locations))
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(unique) or 1)) as pool:
+        futures = {location: pool.submit(fetch_grounding_response, location) for location in unique}
+        for location, future in futures.items():
+            try:
+                results[location] = future.result()
+            except Exception as e:
+                print(f"{location}: {e}")
+                results[location] = None
+    return results
+
+
+def get_review_insights_search_grounding(location: str):
+    """
+    Get comprehensive review insights using Google Search grounding only.
+    """
+    print(f"Querying Google Search grounding for COBS Bread in {location}...")
+    print("=" * 70)
+
+    data = fetch_grounding_response(location)
+    if data is None:
+        return None
 
     # Extract text response
-    text = data.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "No response")
+    text = dig(data, "candidates", 0, "content", "parts", 0, "text", default="No response")
 
     print("\n🔍 GOOGLE SEARCH GROUNDING RESULTS\n")
     print(text)
@@ -115,7 +176,7 @@ Cite which platform each piece of information comes from.
     print("\n" + "=" * 70)
     print("📚 GROUNDING SOURCES:")
 
-    grounding = data.get("candidates", [{}])[0].get("groundingMetadata", {})
+    grounding = dig(data, "candidates", 0, "groundingMetadata", default={})
 
     if grounding:
         # Search queries used
@@ -138,14 +199,28 @@ Cite which platform each piece of information comes from.
         print("  No grounding metadata in response")
 
     # Save full response
-    with open('/tmp/search_grounding_response.json', 'w') as f:
-        json.dump(data, f, indent=2)
+    with open('/tmp/search_grounding_response.json', 'wb') as f:
+        f.write(json_dumps(data, indent=True))
     print(f"\n  Full response saved to /tmp/search_grounding_response.json")
 
     return data
 
 
 if __name__ == "__main__":
+    if not API_KEY:
+        raise SystemExit("GOOGLE_API_KEY is not set")
+
+    # Locations on the command line: ground them together and summarize each
+    if len(sys.argv) > 1:
+        for location, data in fetch_grounding_responses(sys.argv[1:]).items():
+            if data is None:
+                print(f"{location}: ❌ request failed")
+                continue
+            text = dig(data, "candidates", 0, "content", "parts", 0, "text", default="")
+            chunks = dig(data, "candidates", 0, "groundingMetadata", "groundingChunks", default=[])
+            print(f"{location}: {len(text)} chars of insights from {len(chunks)} sources")
+        sys.exit(0)
+
     location = "Kleinburg, Ontario, Canada"
 
     print("\n" + "=" * 80)